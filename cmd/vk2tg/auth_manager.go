@@ -52,11 +52,12 @@ type tokenState struct {
 }
 
 type tokenManager struct {
-	logger     zerolog.Logger
-	updateCh   chan authSuccessPayload
-	requestCh  chan chan string
-	httpClient *http.Client
-	store      *storage
+	logger       zerolog.Logger
+	updateCh     chan authSuccessPayload
+	requestCh    chan chan string
+	invalidateCh chan string
+	httpClient   *http.Client
+	store        *storage
 }
 
 func newTokenManager(logger zerolog.Logger, store *storage) *tokenManager {
@@ -64,13 +65,12 @@ func newTokenManager(logger zerolog.Logger, store *storage) *tokenManager {
 		panic("tokenManager requires non-nil storage")
 	}
 	m := &tokenManager{
-		logger:    logger,
-		updateCh:  make(chan authSuccessPayload),
-		requestCh: make(chan chan string),
-		store:     store,
-		httpClient: &http.Client{
-			Timeout: 10 * time.Second,
-		},
+		logger:       logger,
+		updateCh:     make(chan authSuccessPayload),
+		requestCh:    make(chan chan string),
+		invalidateCh: make(chan string),
+		store:        store,
+		httpClient:   newHTTPClient(10 * time.Second),
 	}
 	go m.run()
 	return m
@@ -80,6 +80,15 @@ func (m *tokenManager) Update(payload authSuccessPayload) {
 	m.updateCh <- payload
 }
 
+func (m *tokenManager) Invalidate(ctx context.Context, accessToken string) error {
+	select {
+	case m.invalidateCh <- accessToken:
+		return nil
+	case <-ctx.Done():
+		return ctx.Err()
+	}
+}
+
 func (m *tokenManager) AccessTokenRequests() chan<- chan string {
 	return m.requestCh
 }
@@ -128,6 +137,21 @@ func (m *tokenManager) run() {
 			}
 			reply <- token
 
+		case rejected := <-m.invalidateCh:
+			if state == nil || rejected != state.payload.AccessToken {
+				m.logger.Info().
+					Msg("ignoring rejection of a stale access token")
+				continue
+			}
+			state.expiresAt = time.Now()
+			if err := m.store.UpsertTokenState(context.Background(), state.payload, state.updatedAt, state.expiresAt); err != nil {
+				m.logger.Error().
+					Err(err).
+					Msg("failed to persist access token invalidation")
+			}
+			m.logger.Warn().
+				Msg("access token rejected by VK, scheduling refresh")
+
 		case <-ticker.C:
 			if state == nil {
 				m.logger.Info().
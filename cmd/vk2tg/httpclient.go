@@ -0,0 +1,29 @@
+package main
+
+import (
+	"net"
+	"net/http"
+	"time"
+)
+
+// httpTransport is shared by every outgoing client so connections to VK and
+// Telegram survive between sync ticks instead of being re-dialed each time.
+// Calls to each host are sequential, so one idle connection per host (VK API,
+// VK ID and Telegram) is enough.
+var httpTransport = &http.Transport{
+	Proxy:                 http.ProxyFromEnvironment,
+	DialContext:           (&net.Dialer{Timeout: 5 * time.Second, KeepAlive: 30 * time.Second}).DialContext,
+	ForceAttemptHTTP2:     true,
+	MaxIdleConns:          3,
+	MaxIdleConnsPerHost:   1,
+	IdleConnTimeout:       6 * time.Minute,
+	TLSHandshakeTimeout:   5 * time.Second,
+	ExpectContinueTimeout: 1 * time.Second,
+}
+
+func newHTTPClient(timeout time.Duration) *http.Client {
+	return &http.Client{
+		Timeout:   timeout,
+		Transport: httpTransport,
+	}
+}
@@ -6,12 +6,13 @@ import (
 	"errors"
 	"fmt"
 	"io"
+	"math/rand/v2"
 	"net/http"
 	"net/url"
 	"sort"
+	"strconv"
 	"strings"
 	"time"
-	"unicode/utf8"
 
 	"github.com/rs/zerolog"
 )
@@ -26,6 +27,17 @@ const (
 	telegramEditCaptionURLFmt    = "https://api.telegram.org/bot%s/editMessageCaption"
 )
 
+const (
+	syncTimeout      = 4 * time.Minute
+	vkFetchTimeout   = 20 * time.Second
+	vkMaxAttempts    = 3
+	vkRetryBaseDelay = time.Second
+)
+
+const vkErrorAuthFailed = 5
+
+const telegramCaptionRuneLimit = 1024
+
 type wallSyncConfig struct {
 	GroupID   string
 	BotToken  string
@@ -43,7 +55,8 @@ func startWallSync(ctx context.Context, logger zerolog.Logger, manager *tokenMan
 		manager:    manager,
 		store:      store,
 		cfg:        cfg,
-		httpClient: &http.Client{Timeout: 10 * time.Second},
+		httpClient: newHTTPClient(10 * time.Second),
+		throttle:   newSendThrottle(3 * time.Second),
 	}
 
 	go syncer.run(ctx)
@@ -55,6 +68,7 @@ type wallSyncer struct {
 	store      *storage
 	cfg        wallSyncConfig
 	httpClient *http.Client
+	throttle   *sendThrottle
 }
 
 func (s *wallSyncer) run(ctx context.Context) {
@@ -73,7 +87,7 @@ func (s *wallSyncer) run(ctx context.Context) {
 }
 
 func (s *wallSyncer) sync(ctx context.Context) {
-	ctx, cancel := context.WithTimeout(ctx, 20*time.Second)
+	ctx, cancel := context.WithTimeout(ctx, syncTimeout)
 	defer cancel()
 
 	accessToken, err := s.manager.RequestAccessToken(ctx)
@@ -90,6 +104,12 @@ func (s *wallSyncer) sync(ctx context.Context) {
 	posts, err := s.fetchVKPosts(ctx, accessToken)
 	if err != nil {
 		s.logger.Error().Err(err).Stack().Msg("failed to fetch posts from VK")
+		var apiErr *vkAPIError
+		if errors.As(err, &apiErr) && apiErr.Code == vkErrorAuthFailed {
+			if err := s.manager.Invalidate(ctx, accessToken); err != nil {
+				s.logger.Error().Err(err).Msg("failed to invalidate rejected access token")
+			}
+		}
 		return
 	}
 
@@ -102,6 +122,8 @@ func (s *wallSyncer) sync(ctx context.Context) {
 		return posts[i].ID < posts[j].ID
 	})
 
+	linkPrefix := "https://vk.com/wall-" + s.cfg.GroupID + "_"
+
 	for _, post := range posts {
 		if post.ID == 0 {
 			continue
@@ -121,11 +143,11 @@ func (s *wallSyncer) sync(ctx context.Context) {
 		}
 
 		text := postText
-		link := fmt.Sprintf("https://vk.com/wall-%s_%d", s.cfg.GroupID, post.ID)
+		link := linkPrefix + strconv.Itoa(post.ID)
 		if text == "" {
 			text = link
 		} else {
-			text = fmt.Sprintf("%s\n\n%s", text, link)
+			text = text + "\n\n" + link
 		}
 
 		if state.Published {
@@ -191,38 +213,80 @@ func (s *wallSyncer) sync(ctx context.Context) {
 }
 
 func (s *wallSyncer) fetchVKPosts(ctx context.Context, accessToken string) ([]vkPost, error) {
+	ctx, cancel := context.WithTimeout(ctx, vkFetchTimeout)
+	defer cancel()
+
+	var lastErr error
+	for attempt := 0; attempt < vkMaxAttempts; attempt++ {
+		if attempt > 0 {
+			if err := sleepContext(ctx, vkRetryDelay(attempt-1)); err != nil {
+				return nil, lastErr
+			}
+		}
+
+		posts, retry, err := s.requestVKPosts(ctx, accessToken)
+		if err == nil {
+			return posts, nil
+		}
+		if !retry {
+			return nil, err
+		}
+		lastErr = err
+
+		s.logger.Warn().
+			Err(err).
+			Int("attempt", attempt+1).
+			Msg("VK request failed, retrying")
+	}
+	return nil, lastErr
+}
+
+func (s *wallSyncer) requestVKPosts(ctx context.Context, accessToken string) ([]vkPost, bool, error) {
 	params := url.Values{}
 	params.Set("access_token", accessToken)
 	params.Set("v", vkAPIVersion)
 	params.Set("count", "20")
+	params.Set("filter", "owner")
 	params.Set("domain", "club"+s.cfg.GroupID)
 
-	req, err := http.NewRequestWithContext(ctx, http.MethodGet, fmt.Sprintf("%s?%s", vkWallGetURL, params.Encode()), nil)
+	req, err := http.NewRequestWithContext(ctx, http.MethodPost, vkWallGetURL, strings.NewReader(params.Encode()))
 	if err != nil {
-		return nil, fmt.Errorf("build VK request: %w", err)
+		return nil, false, fmt.Errorf("build VK request: %w", err)
 	}
+	req.Header.Set("Content-Type", "application/x-www-form-urlencoded")
 
 	resp, err := s.httpClient.Do(req)
 	if err != nil {
-		return nil, fmt.Errorf("execute VK request: %w", err)
+		return nil, ctx.Err() == nil, fmt.Errorf("execute VK request: %w", err)
 	}
 	defer resp.Body.Close()
 
+	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
+		body, _ := io.ReadAll(io.LimitReader(resp.Body, maxErrorBodyKB*1024))
+		return nil, resp.StatusCode >= http.StatusInternalServerError, fmt.Errorf("vk API returned %s: %s", resp.Status, strings.TrimSpace(string(body)))
+	}
+
 	var result vkWallResponse
 	if err := json.NewDecoder(resp.Body).Decode(&result); err != nil {
-		return nil, fmt.Errorf("decode VK response: %w", err)
+		return nil, false, fmt.Errorf("decode VK response: %w", err)
 	}
 
 	if result.Error.Code != 0 {
-		return nil, fmt.Errorf("vk api error %d: %s", result.Error.Code, result.Error.Msg)
+		apiErr := &vkAPIError{Code: result.Error.Code, Msg: result.Error.Msg}
+		return nil, apiErr.retryable(), apiErr
 	}
 
-	return result.Response.Items, nil
+	return result.Response.Items, false, nil
+}
+
+func vkRetryDelay(attempt int) time.Duration {
+	delay := vkRetryBaseDelay << attempt
+	return delay + time.Duration(rand.Float64()*0.5*float64(delay))
 }
 
 func (s *wallSyncer) publishPost(ctx context.Context, post vkPost, text string) ([]telegramMessage, error) {
 	photoURLs := photoAttachmentURLs(post)
-	textLen := utf8.RuneCountInString(text)
+	fitsCaption := fitsTelegramCaption(text)
 
 	var messages []telegramMessage
 
@@ -235,7 +299,7 @@ func (s *wallSyncer) publishPost(ctx context.Context, post vkPost, text string)
 		messages = append(messages, msg)
 	case 1:
 		photoURL := photoURLs[0]
-		if textLen < 1024 {
+		if fitsCaption {
 			msg, err := s.publishPhotoToTelegram(ctx, photoURL, text)
 			if err != nil {
 				return nil, err
@@ -259,7 +323,7 @@ func (s *wallSyncer) publishPost(ctx context.Context, post vkPost, text string)
 			groupMessages []telegramMessage
 			err           error
 		)
-		if textLen < 1024 {
+		if fitsCaption {
 			groupMessages, err = s.publishMediaGroupToTelegram(ctx, photoURLs, text)
 		} else {
 			groupMessages, err = s.publishMediaGroupToTelegram(ctx, photoURLs, "")
@@ -269,7 +333,7 @@ func (s *wallSyncer) publishPost(ctx context.Context, post vkPost, text string)
 		}
 		messages = append(messages, groupMessages...)
 
-		if textLen >= 1024 {
+		if !fitsCaption {
 			msg, err := s.publishTextToTelegram(ctx, text)
 			if err != nil {
 				return nil, err
@@ -329,7 +393,6 @@ func (s *wallSyncer) tryEditTelegramMessage(ctx context.Context, chatID string,
 }
 
 func (s *wallSyncer) publishTextToTelegram(ctx context.Context, text string) (telegramMessage, error) {
-	time.Sleep(5 * time.Second)
 	params := url.Values{}
 	params.Set("chat_id", s.cfg.ChannelID)
 	params.Set("text", text)
@@ -338,21 +401,9 @@ func (s *wallSyncer) publishTextToTelegram(ctx context.Context, text string) (te
 		params.Set("message_thread_id", s.cfg.ThreadID)
 	}
 
-	req, err := http.NewRequestWithContext(ctx, http.MethodPost, fmt.Sprintf(telegramSendURLFmt, s.cfg.BotToken), strings.NewReader(params.Encode()))
+	resp, body, err := s.sendThrottledTelegram(ctx, fmt.Sprintf(telegramSendURLFmt, s.cfg.BotToken), "Telegram", params, 1)
 	if err != nil {
-		return telegramMessage{}, fmt.Errorf("build Telegram request: %w", err)
-	}
-	req.Header.Set("Content-Type", "application/x-www-form-urlencoded")
-
-	resp, err := s.httpClient.Do(req)
-	if err != nil {
-		return telegramMessage{}, fmt.Errorf("execute Telegram request: %w", err)
-	}
-	defer resp.Body.Close()
-
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return telegramMessage{}, fmt.Errorf("read Telegram response: %w", err)
+		return telegramMessage{}, err
 	}
 
 	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
@@ -368,7 +419,6 @@ func (s *wallSyncer) publishTextToTelegram(ctx context.Context, text string) (te
 }
 
 func (s *wallSyncer) publishPhotoToTelegram(ctx context.Context, photoURL, caption string) (telegramMessage, error) {
-	time.Sleep(5 * time.Second)
 	params := url.Values{}
 	params.Set("chat_id", s.cfg.ChannelID)
 	params.Set("photo", photoURL)
@@ -379,21 +429,9 @@ func (s *wallSyncer) publishPhotoToTelegram(ctx context.Context, photoURL, capti
 		params.Set("message_thread_id", s.cfg.ThreadID)
 	}
 
-	req, err := http.NewRequestWithContext(ctx, http.MethodPost, fmt.Sprintf(telegramSendPhotoURLFmt, s.cfg.BotToken), strings.NewReader(params.Encode()))
+	resp, body, err := s.sendThrottledTelegram(ctx, fmt.Sprintf(telegramSendPhotoURLFmt, s.cfg.BotToken), "Telegram", params, 1)
 	if err != nil {
-		return telegramMessage{}, fmt.Errorf("build Telegram request: %w", err)
-	}
-	req.Header.Set("Content-Type", "application/x-www-form-urlencoded")
-
-	resp, err := s.httpClient.Do(req)
-	if err != nil {
-		return telegramMessage{}, fmt.Errorf("execute Telegram request: %w", err)
-	}
-	defer resp.Body.Close()
-
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return telegramMessage{}, fmt.Errorf("read Telegram response: %w", err)
+		return telegramMessage{}, err
 	}
 
 	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
@@ -409,8 +447,6 @@ func (s *wallSyncer) publishPhotoToTelegram(ctx context.Context, photoURL, capti
 }
 
 func (s *wallSyncer) publishMediaGroupToTelegram(ctx context.Context, photoURLs []string, caption string) ([]telegramMessage, error) {
-	time.Sleep(5 * time.Second)
-
 	media := make([]telegramInputMediaPhoto, 0, len(photoURLs))
 	for idx, url := range photoURLs {
 		item := telegramInputMediaPhoto{
@@ -439,21 +475,9 @@ func (s *wallSyncer) publishMediaGroupToTelegram(ctx context.Context, photoURLs
 		params.Set("message_thread_id", s.cfg.ThreadID)
 	}
 
-	req, err := http.NewRequestWithContext(ctx, http.MethodPost, fmt.Sprintf(telegramSendMediaGroupURLFmt, s.cfg.BotToken), strings.NewReader(params.Encode()))
+	resp, body, err := s.sendThrottledTelegram(ctx, fmt.Sprintf(telegramSendMediaGroupURLFmt, s.cfg.BotToken), "Telegram media group", params, len(media))
 	if err != nil {
-		return nil, fmt.Errorf("build Telegram media group request: %w", err)
-	}
-	req.Header.Set("Content-Type", "application/x-www-form-urlencoded")
-
-	resp, err := s.httpClient.Do(req)
-	if err != nil {
-		return nil, fmt.Errorf("execute Telegram media group request: %w", err)
-	}
-	defer resp.Body.Close()
-
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return nil, fmt.Errorf("read Telegram media group response: %w", err)
+		return nil, err
 	}
 
 	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
@@ -470,10 +494,49 @@ func (s *wallSyncer) publishMediaGroupToTelegram(ctx context.Context, photoURLs
 	return msgs, nil
 }
 
+func (s *wallSyncer) sendThrottledTelegram(ctx context.Context, endpoint, label string, params url.Values, messages int) (*http.Response, []byte, error) {
+	for attempt := 0; ; attempt++ {
+		if err := s.throttle.Wait(ctx, messages); err != nil {
+			return nil, nil, err
+		}
+
+		req, err := http.NewRequestWithContext(ctx, http.MethodPost, endpoint, strings.NewReader(params.Encode()))
+		if err != nil {
+			return nil, nil, fmt.Errorf("build %s request: %w", label, err)
+		}
+		req.Header.Set("Content-Type", "application/x-www-form-urlencoded")
+
+		resp, err := s.httpClient.Do(req)
+		if err != nil {
+			return nil, nil, fmt.Errorf("execute %s request: %w", label, err)
+		}
+
+		body, err := io.ReadAll(resp.Body)
+		resp.Body.Close()
+		if err != nil {
+			return nil, nil, fmt.Errorf("read %s response: %w", label, err)
+		}
+
+		if resp.StatusCode != http.StatusTooManyRequests {
+			return resp, body, nil
+		}
+
+		retryAfter := telegramRetryAfter(body)
+		s.throttle.Backoff(retryAfter)
+		if attempt > 0 {
+			return resp, body, nil
+		}
+
+		s.logger.Warn().
+			Dur("retry_after", retryAfter).
+			Msg("telegram rate limit hit, retrying send")
+	}
+}
+
 func (s *wallSyncer) editTelegramMessageText(ctx context.Context, chatID string, messageID int64, text string) (telegramMessage, error) {
 	params := url.Values{}
 	params.Set("chat_id", chatID)
-	params.Set("message_id", fmt.Sprintf("%d", messageID))
+	params.Set("message_id", strconv.FormatInt(messageID, 10))
 	params.Set("text", text)
 	params.Set("disable_web_page_preview", "false")
 	if s.cfg.ThreadID != "" {
@@ -500,6 +563,9 @@ func (s *wallSyncer) editTelegramMessageText(ctx context.Context, chatID string,
 	if resp.StatusCode == http.StatusBadRequest {
 		return telegramMessage{}, &telegramAPIError{Code: http.StatusBadRequest, Description: strings.TrimSpace(string(body))}
 	}
+	if resp.StatusCode == http.StatusTooManyRequests {
+		s.throttle.Backoff(telegramRetryAfter(body))
+	}
 	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
 		return telegramMessage{}, fmt.Errorf("telegram API returned %s: %s", resp.Status, strings.TrimSpace(string(body)))
 	}
@@ -515,7 +581,7 @@ func (s *wallSyncer) editTelegramMessageText(ctx context.Context, chatID string,
 func (s *wallSyncer) editTelegramMessageCaption(ctx context.Context, chatID string, messageID int64, caption string) (telegramMessage, error) {
 	params := url.Values{}
 	params.Set("chat_id", chatID)
-	params.Set("message_id", fmt.Sprintf("%d", messageID))
+	params.Set("message_id", strconv.FormatInt(messageID, 10))
 	params.Set("caption", caption)
 	if s.cfg.ThreadID != "" {
 		params.Set("message_thread_id", s.cfg.ThreadID)
@@ -541,6 +607,9 @@ func (s *wallSyncer) editTelegramMessageCaption(ctx context.Context, chatID stri
 	if resp.StatusCode == http.StatusBadRequest {
 		return telegramMessage{}, &telegramAPIError{Code: http.StatusBadRequest, Description: strings.TrimSpace(string(body))}
 	}
+	if resp.StatusCode == http.StatusTooManyRequests {
+		s.throttle.Backoff(telegramRetryAfter(body))
+	}
 	if resp.StatusCode < http.StatusOK || resp.StatusCode >= http.StatusBadRequest {
 		return telegramMessage{}, fmt.Errorf("telegram API returned %s: %s", resp.Status, strings.TrimSpace(string(body)))
 	}
@@ -590,6 +659,27 @@ type vkWallResponse struct {
 	} `json:"error"`
 }
 
+type vkAPIError struct {
+	Code int
+	Msg  string
+}
+
+func (e *vkAPIError) Error() string {
+	if e == nil {
+		return ""
+	}
+	return fmt.Sprintf("vk api error %d: %s", e.Code, e.Msg)
+}
+
+func (e *vkAPIError) retryable() bool {
+	switch e.Code {
+	case 6, 10, 603:
+		return true
+	default:
+		return false
+	}
+}
+
 type vkAttachment struct {
 	Type  string   `json:"type"`
 	Photo *vkPhoto `json:"photo"`
@@ -634,6 +724,9 @@ type telegramResponseEnvelope struct {
 	Result      json.RawMessage `json:"result"`
 	Description string          `json:"description"`
 	ErrorCode   int             `json:"error_code"`
+	Parameters  struct {
+		RetryAfter int `json:"retry_after"`
+	} `json:"parameters"`
 }
 
 type telegramInputMediaPhoto struct {
@@ -720,6 +813,14 @@ func parseTelegramResponseEnvelope(body []byte) (telegramResponseEnvelope, error
 	return env, nil
 }
 
+func telegramRetryAfter(body []byte) time.Duration {
+	var env telegramResponseEnvelope
+	if err := json.Unmarshal(body, &env); err != nil {
+		return 0
+	}
+	return time.Duration(env.Parameters.RetryAfter) * time.Second
+}
+
 func telegramMessageFromPayload(payload telegramMessagePayload) (telegramMessage, error) {
 	if payload.MessageID == 0 {
 		return telegramMessage{}, fmt.Errorf("telegram API response missing message_id")
@@ -736,6 +837,20 @@ func telegramMessageFromPayload(payload telegramMessagePayload) (telegramMessage
 	}, nil
 }
 
+func fitsTelegramCaption(text string) bool {
+	if len(text) < telegramCaptionRuneLimit {
+		return true
+	}
+	runes := 0
+	for range text {
+		runes++
+		if runes >= telegramCaptionRuneLimit {
+			return false
+		}
+	}
+	return true
+}
+
 func photoAttachmentURLs(post vkPost) []string {
 	urls := make([]string, 0, len(post.Attachments))
 	for _, att := range post.Attachments {
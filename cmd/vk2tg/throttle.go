@@ -0,0 +1,84 @@
+package main
+
+import (
+	"context"
+	"sync"
+	"time"
+)
+
+const (
+	throttleMaxInterval    = time.Minute
+	throttleRecoveryPeriod = 30 * time.Second
+)
+
+// sendThrottle spaces outgoing messages at a fixed interval, doubling it when
+// the remote side reports rate limiting and restoring it once calls have
+// gone through cleanly for throttleRecoveryPeriod.
+type sendThrottle struct {
+	mu       sync.Mutex
+	base     time.Duration
+	interval time.Duration
+	next     time.Time
+	slowedAt time.Time
+}
+
+func newSendThrottle(interval time.Duration) *sendThrottle {
+	return &sendThrottle{
+		base:     interval,
+		interval: interval,
+	}
+}
+
+// Wait blocks until a call carrying the given number of messages may be sent
+// and reserves that many slots for it.
+func (t *sendThrottle) Wait(ctx context.Context, messages int) error {
+	if messages < 1 {
+		messages = 1
+	}
+
+	t.mu.Lock()
+	now := time.Now()
+	if t.interval != t.base && now.Sub(t.slowedAt) >= throttleRecoveryPeriod {
+		t.interval = t.base
+	}
+	slot := t.next
+	if slot.Before(now) {
+		slot = now
+	}
+	t.next = slot.Add(t.interval * time.Duration(messages))
+	t.mu.Unlock()
+
+	return sleepContext(ctx, time.Until(slot))
+}
+
+func (t *sendThrottle) Backoff(retryAfter time.Duration) {
+	t.mu.Lock()
+	defer t.mu.Unlock()
+
+	now := time.Now()
+	t.interval *= 2
+	if t.interval > throttleMaxInterval {
+		t.interval = throttleMaxInterval
+	}
+	t.slowedAt = now
+
+	if until := now.Add(retryAfter); until.After(t.next) {
+		t.next = until
+	}
+}
+
+func sleepContext(ctx context.Context, d time.Duration) error {
+	if d <= 0 {
+		return ctx.Err()
+	}
+
+	timer := time.NewTimer(d)
+	defer timer.Stop()
+
+	select {
+	case <-ctx.Done():
+		return ctx.Err()
+	case <-timer.C:
+		return nil
+	}
+}